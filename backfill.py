@@ -0,0 +1,205 @@
+"""Backfill: replay archived mail (mbox files, .eml directories) through parse -> route -> Slack."""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict
+from email import policy
+from email.parser import BytesHeaderParser
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Slack allows roughly one chat.postMessage per second per channel.
+DEFAULT_INTERVAL_S = 1.0
+PROGRESS_EVERY = 100
+
+
+def _load_checkpoint(path: Path | None) -> tuple[dict[str, int], dict | None]:
+    """Return (offsets, partial): per-file byte offsets and the partly delivered email, if any."""
+    if path is None or not path.exists():
+        return {}, None
+    data = json.loads(path.read_text())
+    offsets = {k: int(v) for k, v in data.get("offsets", {}).items()}
+    return offsets, data.get("partial")
+
+
+def _save_checkpoint(
+    path: Path | None, offsets: dict[str, int], partial: dict | None = None
+) -> None:
+    """
+    Save offsets, plus partial for an email whose Slack message was posted but
+    whose attachments were not all uploaded, so a rerun does not post it again.
+    """
+    if path is None:
+        return
+    # Write then rename so an interrupted run never leaves a truncated file.
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps({"offsets": offsets, "partial": partial}, indent=2))
+    os.replace(tmp, path)
+
+
+def _header_block(raw: bytes) -> bytes:
+    """The header section of a raw message (up to the first blank line)."""
+    ends = [i for i in (raw.find(b"\n\n"), raw.find(b"\r\n\r\n")) if i != -1]
+    return raw[: min(ends) + 2] if ends else raw
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "paths", nargs="+", type=Path, help="mbox files and/or directories of .eml files"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="parse and route only; send nothing to Slack"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=None,
+        help="JSON file recording progress; rerun with the same file to resume",
+    )
+    parser.add_argument(
+        "--route", default=None, help="only deliver emails for this route key (e.g. permit_issuance)"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL_S,
+        help=(
+            "seconds to wait after each Slack message and each attachment upload "
+            f"(default: {DEFAULT_INTERVAL_S})"
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    from email_to_slack.logging_config import setup_logging
+    from email_to_slack.email import archive_files, email_from_bytes, iter_archive
+    from email_to_slack.email.fetcher import from_matches_allowed
+    from email_to_slack.config import config_from_env
+    from email_to_slack.pipeline import (
+        DeliveryProgress,
+        deliver_email,
+        route_for_subject,
+        route_target,
+    )
+    from email_to_slack.slack import SlackClient
+
+    args = _parse_args(argv)
+    setup_logging()
+
+    config = config_from_env()
+    slack = None if args.dry_run else SlackClient(config.slack.token, retry_on_rate_limit=True)
+    # A dry run never advances the checkpoint, so the real run still sees everything.
+    checkpoint_path = None if args.dry_run else args.checkpoint
+    checkpoint, partial = _load_checkpoint(args.checkpoint)
+
+    files = archive_files(args.paths)
+    total_bytes = sum(f.stat().st_size for f in files)
+    resumed_bytes = sum(min(checkpoint.get(str(f), 0), f.stat().st_size) for f in files)
+    logger.info(
+        f"Backfilling {len(files)} file(s), {total_bytes / 1e6:.1f} MB"
+        + (f" (resuming at {resumed_bytes / 1e6:.1f} MB)" if resumed_bytes else "")
+        + (" [dry run]" if args.dry_run else "")
+    )
+
+    started_at = time.monotonic()
+    seen = routed = delivered = skipped = 0
+    offsets = dict(checkpoint)
+    for msg in iter_archive(files, checkpoint):
+        seen += 1
+        routed_now = False
+        try:
+            # Headers only first: the full MIME parse decodes every attachment,
+            # so it is done only for emails that pass the filters below.
+            headers = BytesHeaderParser(policy=policy.default).parsebytes(
+                _header_block(msg.raw)
+            )
+            subject = str(headers.get("Subject") or "")
+            from_header = str(headers.get("From") or "")
+            route_key = route_for_subject(subject)
+
+            em = None
+            if not from_matches_allowed(from_header, config.imap.allowed_from):
+                logger.debug(f"Skipping email from non-allowed sender: {from_header}")
+            elif args.route and route_key != args.route:
+                logger.debug(f"Skipping email outside route {args.route}: {subject}")
+            elif route_target(route_key, config) == (None, None):
+                logger.warning(f"Skipping email with no Slack destination: {subject}")
+            else:
+                em = email_from_bytes(msg.raw, uid=f"{msg.source}@{msg.end_offset}")
+        except Exception as e:
+            # A malformed message must not block the rest of the archive.
+            logger.warning(
+                f"Skipping unparseable email in {msg.source} ending at offset {msg.end_offset}: "
+                f"{type(e).__name__}: {e}"
+            )
+            skipped += 1
+            offsets[msg.source] = msg.end_offset
+            continue
+
+        if em is not None:
+            routed += 1
+            routed_now = True
+            progress = DeliveryProgress()
+            if partial and (partial["source"], partial["end_offset"]) == (msg.source, msg.end_offset):
+                progress = DeliveryProgress(
+                    posted=partial["posted"],
+                    attachments_uploaded=list(partial["attachments_uploaded"]),
+                )
+                logger.info(f"Resuming partly delivered email '{em['subject']}'")
+            try:
+                ok = deliver_email(
+                    em, config=config, slack=slack, dry_run=args.dry_run, progress=progress
+                )
+            except Exception as e:
+                logger.error(f"Error processing email '{em['subject']}': {e}")
+                ok = False
+            if not args.dry_run and args.interval > 0:
+                time.sleep(args.interval * (1 + len(em["attachments"])))
+            if not ok:
+                # Leave the checkpoint before this email so a rerun retries it,
+                # skipping whatever part of it already reached Slack.
+                _save_checkpoint(
+                    checkpoint_path,
+                    offsets,
+                    {"source": msg.source, "end_offset": msg.end_offset, **asdict(progress)},
+                )
+                logger.error(
+                    f"Stopping backfill: delivery failed for '{em['subject']}' "
+                    f"({msg.source} before offset {msg.end_offset}); rerun to resume"
+                )
+                sys.exit(1)
+            delivered += 1
+
+        offsets[msg.source] = msg.end_offset
+        # Persist after every delivery (no duplicates on resume); skipped
+        # emails are cheap to re-read, so only checkpoint them periodically.
+        if routed_now or seen % PROGRESS_EVERY == 0:
+            _save_checkpoint(checkpoint_path, offsets)
+
+        if seen % PROGRESS_EVERY == 0:
+            done = sum(offsets.get(str(f), 0) for f in files)
+            elapsed = time.monotonic() - started_at
+            rate = (done - resumed_bytes) / 1e6 / elapsed if elapsed else 0.0
+            logger.info(
+                f"Progress: {seen} email(s) read, {delivered}/{routed} delivered, "
+                f"{done / 1e6:.1f}/{total_bytes / 1e6:.1f} MB ({rate:.1f} MB/s)"
+            )
+
+    _save_checkpoint(checkpoint_path, offsets)
+    elapsed = time.monotonic() - started_at
+    logger.info(
+        f"Backfill finished in {elapsed:.1f}s: {seen} email(s) read, "
+        f"{routed} matched, {delivered} {'routed' if args.dry_run else 'delivered'}, "
+        f"{skipped} unparseable"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,12 @@ def config_from_env() -> "Config":
         slack=SlackConfig(
             token=os.environ.get("SLACK_BOT_TOKEN", ""),
         ),
+        run=RunConfig(
+            time_budget_s=float(os.environ.get("RUN_TIME_BUDGET_SECONDS", "300")),
+            safety_margin_s=float(os.environ.get("RUN_SAFETY_MARGIN_SECONDS", "30")),
+            order=os.environ.get("RUN_ORDER", "oldest"),
+            stats_path=os.environ.get("RUN_STATS_PATH", ""),
+        ),
     )
 
 
@@ -74,8 +80,21 @@ class SlackConfig:
     user_ids: dict[str, Optional[str]] = field(default_factory=dict)
 
 
+@dataclass
+class RunConfig:
+    """Time budget for one job run (Cloud Run --task-timeout)."""
+    time_budget_s: float = 300.0
+    # Stop taking new emails this long before the deadline (startup, IMAP \Seen flagging).
+    safety_margin_s: float = 30.0
+    # "oldest" (IMAP order) or "priority" (SUBJECT_ROUTES order, then oldest).
+    order: str = "oldest"
+    # JSON file carrying throughput stats between runs; empty disables persistence.
+    stats_path: str = ""
+
+
 @dataclass
 class Config:
     """Top-level configuration."""
     imap: ImapConfig = field(default_factory=ImapConfig)
     slack: SlackConfig = field(default_factory=SlackConfig)
+    run: RunConfig = field(default_factory=RunConfig)
@@ -1,6 +1,13 @@
 """Email fetching and parsing."""
 
-from .fetcher import EmailFetcher
+from .archive import archive_files, iter_archive
+from .fetcher import EmailFetcher, email_from_bytes
 from .parser import parse_email_to_mrkdwn
 
-__all__ = ["EmailFetcher", "parse_email_to_mrkdwn"]
+__all__ = [
+    "EmailFetcher",
+    "archive_files",
+    "email_from_bytes",
+    "iter_archive",
+    "parse_email_to_mrkdwn",
+]
@@ -0,0 +1,112 @@
+"""Read archived emails (mbox files, .eml directories) via memory-mapped files."""
+
+import logging
+import mmap
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# mboxrd quoting: any line matching ">*From " got one extra ">" when written.
+_MBOXRD_QUOTED = re.compile(rb"^>(>*From )", re.MULTILINE)
+
+
+@dataclass
+class ArchivedMessage:
+    """One raw message and where the next one starts in its source file."""
+    source: str
+    end_offset: int
+    raw: bytes
+
+
+@contextmanager
+def _mapped(path: Path) -> Iterator[mmap.mmap | None]:
+    """Map a file read-only; yields None for empty files (mmap cannot map them)."""
+    with open(path, "rb") as f:
+        if path.stat().st_size == 0:
+            yield None
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield mm
+        finally:
+            mm.close()
+
+
+def iter_mbox(path: Path, start: int = 0) -> Iterator[ArchivedMessage]:
+    """
+    Yield messages from an mbox file, starting at byte offset start.
+    Messages are split on "From " lines; mboxrd ">From " / ">>From " quoting is undone.
+    """
+    with _mapped(path) as mm:
+        if mm is None:
+            return
+        size = len(mm)
+        pos = start
+        if mm[pos : pos + 5] != b"From ":
+            nxt = mm.find(b"\nFrom ", pos)
+            if nxt == -1:
+                logger.warning(f"No mbox 'From ' separator found in {path} after offset {start}")
+                return
+            pos = nxt + 1
+
+        while pos < size:
+            body_start = mm.find(b"\n", pos)
+            if body_start == -1:
+                break
+            body_start += 1
+            nxt = mm.find(b"\nFrom ", body_start)
+            end = size if nxt == -1 else nxt + 1
+            raw = mm[body_start:end]
+            if b">From " in raw:
+                raw = _MBOXRD_QUOTED.sub(rb"\1", raw)
+            yield ArchivedMessage(source=str(path), end_offset=end, raw=raw)
+            pos = end
+
+
+def iter_eml(path: Path) -> Iterator[ArchivedMessage]:
+    """Yield the single message in an .eml file."""
+    with _mapped(path) as mm:
+        if mm is None:
+            return
+        yield ArchivedMessage(source=str(path), end_offset=len(mm), raw=mm[:])
+
+
+def archive_files(paths: list[Path]) -> list[Path]:
+    """
+    Expand directories to their .eml files (sorted); other paths are treated as mbox.
+    Paths are resolved, so checkpoint keys match however the archive was named.
+    """
+    files = []
+    for path in paths:
+        path = path.resolve()
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*.eml") if p.is_file()))
+        else:
+            files.append(path)
+    return files
+
+
+def iter_archive(
+    files: list[Path], checkpoint: dict[str, int] | None = None
+) -> Iterator[ArchivedMessage]:
+    """
+    Yield messages from mbox and .eml files in order.
+    checkpoint maps resolved source path to the byte offset already processed; those
+    bytes are skipped so an interrupted backfill resumes where it stopped.
+    """
+    checkpoint = checkpoint or {}
+    for path in files:
+        path = path.resolve()
+        done = checkpoint.get(str(path), 0)
+        if done and done >= path.stat().st_size:
+            continue
+        if path.suffix.lower() == ".eml":
+            yield from iter_eml(path)
+        else:
+            yield from iter_mbox(path, start=done)
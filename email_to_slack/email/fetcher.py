@@ -2,13 +2,18 @@
 
 import imaplib
 import logging
+import re
 from email import policy
 from email.parser import BytesParser
+from typing import Callable
 
 from ..config import ImapConfig
 
 logger = logging.getLogger(__name__)
 
+_SIZE_RE = re.compile(rb"RFC822\.SIZE (\d+)")
+_HEADER_LITERAL_RE = re.compile(rb"BODY\[HEADER[^\]]*\] \{\d+\}$")
+
 
 def _decode_header(value: str | None) -> str:
     if value is None:
@@ -18,7 +23,7 @@ def _decode_header(value: str | None) -> str:
     return str(value)
 
 
-def _from_matches_allowed(from_header: str, allowed: list[str]) -> bool:
+def from_matches_allowed(from_header: str, allowed: list[str]) -> bool:
     from_lower = from_header.lower()
     for addr in allowed:
         if addr.lower() in from_lower:
@@ -26,11 +31,181 @@ def _from_matches_allowed(from_header: str, allowed: list[str]) -> bool:
     return False
 
 
+def _flatten_fetch_response(parts: list) -> tuple[bytes, bytes]:
+    """
+    Join an imaplib FETCH response into one line with literals inlined as quoted
+    strings. Returns (line, header literal).
+    """
+    line = b""
+    header = b""
+    for part in parts:
+        if isinstance(part, tuple):
+            meta, literal = part
+            literal = literal or b""
+            if _HEADER_LITERAL_RE.search(meta):
+                header = literal
+            quoted = literal.replace(b"\\", b"\\\\").replace(b'"', b'\\"')
+            line += meta[: meta.rfind(b"{")] + b'"' + quoted + b'"'
+        elif part is not None:
+            line += part
+    return line, header
+
+
+def _parse_sexp(data: bytes, pos: int = 0) -> tuple[object, int]:
+    """Parse one IMAP value (list, quoted string, atom or NIL) starting at pos."""
+    while data[pos : pos + 1] == b" ":
+        pos += 1
+    c = data[pos : pos + 1]
+    if c == b"(":
+        items = []
+        pos += 1
+        while True:
+            while data[pos : pos + 1] == b" ":
+                pos += 1
+            if pos >= len(data):
+                raise ValueError("unterminated list")
+            if data[pos : pos + 1] == b")":
+                return items, pos + 1
+            item, pos = _parse_sexp(data, pos)
+            items.append(item)
+    if c == b'"':
+        out = bytearray()
+        pos += 1
+        while pos < len(data) and data[pos : pos + 1] != b'"':
+            if data[pos : pos + 1] == b"\\":
+                pos += 1
+            out += data[pos : pos + 1]
+            pos += 1
+        return out.decode(errors="replace"), pos + 1
+    end = pos
+    while end < len(data) and data[end : end + 1] not in (b" ", b"(", b")"):
+        end += 1
+    if end == pos:
+        raise ValueError(f"unexpected {c!r} at {pos}")
+    atom = data[pos:end].decode(errors="replace")
+    return (None if atom.upper() == "NIL" else atom), end
+
+
+def _has_param(params: object, key: str) -> bool:
+    """True if an IMAP parameter list ("k" "v" ...) has key (or its RFC 2231 form)."""
+    if not isinstance(params, list):
+        return False
+    return any(
+        isinstance(k, str) and k.lower().split("*")[0] == key
+        for k in params[::2]
+    )
+
+
+def _count_attachments(structure: object) -> int:
+    """Count parts with a filename in a parsed BODYSTRUCTURE, as email_from_bytes does."""
+    if not isinstance(structure, list) or not structure:
+        return 0
+    if isinstance(structure[0], list):
+        # multipart: child parts come first, then the subtype and extension data.
+        count = 0
+        for part in structure:
+            if not isinstance(part, list):
+                break
+            count += _count_attachments(part)
+        return count
+
+    # Disposition is the extension item shaped ("attachment" ("filename" "x.pdf")).
+    disposition = next(
+        (
+            x for x in structure[7:]
+            if isinstance(x, list) and len(x) == 2 and isinstance(x[0], str)
+            and (x[1] is None or isinstance(x[1], list))
+        ),
+        None,
+    )
+    named = len(structure) > 2 and _has_param(structure[2], "name")
+    if disposition is not None and _has_param(disposition[1], "filename"):
+        named = True
+    count = 1 if named else 0
+    if (
+        isinstance(structure[0], str) and isinstance(structure[1], str)
+        and f"{structure[0]}/{structure[1]}".lower() == "message/rfc822"
+        and len(structure) > 8
+    ):
+        count += _count_attachments(structure[8])
+    return count
+
+
+def _attachment_count(line: bytes) -> int:
+    """Attachment count from the BODYSTRUCTURE item of a flattened FETCH line."""
+    start = line.upper().find(b"BODYSTRUCTURE ")
+    if start == -1:
+        return 0
+    try:
+        structure, _ = _parse_sexp(line, start + len(b"BODYSTRUCTURE "))
+    except (ValueError, IndexError) as e:
+        logger.warning(f"Could not parse BODYSTRUCTURE: {e}")
+        return 0
+    return _count_attachments(structure)
+
+
+def email_from_bytes(raw: bytes, *, uid: str) -> dict:
+    """
+    Parse one raw RFC 822 message into the email dict used by the pipeline:
+    uid, message_id, subject, date, from, html, attachments, size.
+    """
+    msg = BytesParser(policy=policy.default).parsebytes(raw)
+
+    subject = _decode_header(msg.get("Subject"))
+    date = _decode_header(msg.get("Date"))
+    message_id = _decode_header(msg.get("Message-ID")) or uid
+    html = ""
+    text_plain = ""
+
+    if msg.is_multipart():
+        for part in msg.walk():
+            ctype = part.get_content_type()
+            filename = part.get_filename()
+            if filename:
+                continue  # attachment, handled below
+            if ctype == "text/html":
+                payload = part.get_payload(decode=True)
+                html = (payload or b"").decode(errors="replace")
+            elif ctype == "text/plain":
+                payload = part.get_payload(decode=True)
+                text_plain = (payload or b"").decode(errors="replace")
+    else:
+        payload = msg.get_payload(decode=True)
+        decoded = (payload or b"").decode(errors="replace")
+        if msg.get_content_type() == "text/html":
+            html = decoded
+        else:
+            text_plain = decoded
+
+    attachments = []
+    if msg.is_multipart():
+        for part in msg.walk():
+            filename = part.get_filename()
+            if filename:
+                attachments.append({
+                    "filename": filename,
+                    "content": part.get_payload(decode=True) or b"",
+                    "content_type": part.get_content_type(),
+                })
+
+    return {
+        "uid": uid,
+        "message_id": message_id,
+        "subject": subject,
+        "date": date,
+        "from": _decode_header(msg.get("From")),
+        "html": html or text_plain,
+        "attachments": attachments,
+        "size": len(raw),
+    }
+
+
 class EmailFetcher:
-    """Fetches unseen emails from IMAP and yields raw message data with attachments."""
+    """IMAP session that lists unseen emails, fetches them one by one and flags them \\Seen."""
 
     def __init__(self, config: ImapConfig) -> None:
         self.config = config
+        self._conn: imaplib.IMAP4_SSL | None = None
 
     def _connect(self) -> imaplib.IMAP4_SSL:
         logger.info(f"Connecting to IMAP server: {self.config.host}:{self.config.port}")
@@ -43,105 +218,86 @@ class EmailFetcher:
             logger.error(f"Failed to connect to IMAP server: {e}")
             raise
 
-    def fetch_unseen(self) -> list[dict]:
+    # One connection is held open for the run so each email can be fetched and
+    # flagged \Seen individually, right after it has been delivered.
+
+    def __enter__(self) -> "EmailFetcher":
+        self._conn = self._connect()
+        self._conn.select("INBOX")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        conn, self._conn = self._conn, None
+        try:
+            conn.logout()
+            logger.info("Disconnected from IMAP server")
+        except Exception:
+            pass
+
+    def list_unseen(
+        self,
+        *,
+        limit: int | None = None,
+        remaining: Callable[[], float] | None = None,
+    ) -> list[dict]:
         """
-        Fetch unseen emails from allowed senders.
-        Returns list of dicts: uid, message_id, subject, date, from, html, attachments.
+        List unseen emails from allowed senders without downloading bodies, oldest first.
+        Returns list of dicts: uid, subject, date, from, size (RFC822.SIZE) and
+        attachment_count (from BODYSTRUCTURE).
+        limit: list at most this many allowed emails.
+        remaining: seconds left in the run; listing stops once it reaches zero.
+        Requires an open session (use the fetcher as a context manager).
         """
-        conn = self._connect()
-        try:
-            conn.select("INBOX")
-            _, data = conn.search(None, "UNSEEN")
-            uids = data[0].split()
-            
-            if not uids:
-                logger.info("No unseen emails found")
-                return []
-
-            logger.info(f"Found {len(uids)} unseen email(s)")
-            emails = []
-            
-            for uid in uids:
-                uid_s = uid.decode() if isinstance(uid, bytes) else str(uid)
-                # Peek at From header only; do not fetch or mark non-allowed emails.
-                _, head_data = conn.fetch(uid, "(BODY.PEEK[HEADER.FIELDS (FROM)])")
-                if not head_data or not head_data[0]:
-                    continue
-                raw_header = head_data[0][1]
-                if raw_header is None:
-                    continue
-                from_header = _decode_header(
-                    BytesParser(policy=policy.default).parsebytes(raw_header).get("From")
-                )
-                
-                if not _from_matches_allowed(from_header, self.config.allowed_from):
-                    logger.warning(f"Skipping email from non-allowed sender: {from_header}")
-                    continue
-
-                # Only allowed senders: fetch full message and mark as seen.
-                _, msg_data = conn.fetch(uid, "(RFC822)")
-                if not msg_data or not msg_data[0]:
-                    continue
-                raw = msg_data[0][1]
-                msg = BytesParser(policy=policy.default).parsebytes(raw)
-
-                subject = _decode_header(msg.get("Subject"))
-                date = _decode_header(msg.get("Date"))
-                message_id = _decode_header(msg.get("Message-ID")) or uid_s
-                html = ""
-                text_plain = ""
-
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        ctype = part.get_content_type()
-                        filename = part.get_filename()
-                        if filename:
-                            continue  # attachment, handled below
-                        if ctype == "text/html":
-                            payload = part.get_payload(decode=True)
-                            html = (payload or b"").decode(errors="replace")
-                        elif ctype == "text/plain":
-                            payload = part.get_payload(decode=True)
-                            text_plain = (payload or b"").decode(errors="replace")
-                else:
-                    payload = msg.get_payload(decode=True)
-                    decoded = (payload or b"").decode(errors="replace")
-                    if msg.get_content_type() == "text/html":
-                        html = decoded
-                    else:
-                        text_plain = decoded
-
-                attachments = []
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        filename = part.get_filename()
-                        if filename:
-                            attachments.append({
-                                "filename": filename,
-                                "content": part.get_payload(decode=True) or b"",
-                                "content_type": part.get_content_type(),
-                            })
-
-                emails.append({
-                    "uid": uid_s,
-                    "message_id": message_id,
-                    "subject": subject,
-                    "date": date,
-                    "from": from_header,
-                    "html": html or text_plain,
-                    "attachments": attachments,
-                })
-                
-                logger.info(f"Processed email: '{subject}' from {from_header}")
-                conn.store(uid_s, "+FLAGS", "\\Seen")
+        conn = self._conn
+        _, data = conn.uid("SEARCH", None, "UNSEEN")
+        uids = data[0].split()
+        logger.info(f"Found {len(uids)} unseen email(s)")
 
-            return emails
-        except Exception as e:
-            logger.error(f"Error fetching emails: {e}")
-            raise
-        finally:
-            try:
-                conn.logout()
-                logger.info("Disconnected from IMAP server")
-            except Exception:
-                pass
+        candidates = []
+        for uid in uids:
+            if limit is not None and len(candidates) >= limit:
+                logger.info(f"Listing limit of {limit} reached; leaving the rest unseen")
+                break
+            if remaining is not None and remaining() <= 0:
+                logger.warning("Out of time while listing unseen emails")
+                break
+            uid_s = uid.decode() if isinstance(uid, bytes) else str(uid)
+            _, head_data = conn.uid(
+                "FETCH",
+                uid,
+                "(RFC822.SIZE BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE)])",
+            )
+            if not head_data or not isinstance(head_data[0], tuple):
+                continue
+            line, raw_header = _flatten_fetch_response(head_data)
+            size_match = _SIZE_RE.search(line)
+            headers = BytesParser(policy=policy.default).parsebytes(raw_header)
+            from_header = _decode_header(headers.get("From"))
+
+            if not from_matches_allowed(from_header, self.config.allowed_from):
+                logger.warning(f"Skipping email from non-allowed sender: {from_header}")
+                continue
+
+            candidates.append({
+                "uid": uid_s,
+                "subject": _decode_header(headers.get("Subject")),
+                "date": _decode_header(headers.get("Date")),
+                "from": from_header,
+                "size": int(size_match.group(1)) if size_match else 0,
+                "attachment_count": _attachment_count(line),
+            })
+        return candidates
+
+    def fetch_email(self, uid: str) -> dict | None:
+        """Download one email by UID without marking it as seen (requires an open session)."""
+        _, msg_data = self._conn.uid("FETCH", uid, "(BODY.PEEK[])")
+        if not msg_data or not isinstance(msg_data[0], tuple):
+            return None
+        return email_from_bytes(msg_data[0][1], uid=uid)
+
+    def mark_seen(self, uids: list[str]) -> None:
+        """Flag the given UIDs as \\Seen (requires an open session)."""
+        if not uids:
+            return
+        self._conn.uid("STORE", ",".join(uids), "+FLAGS", "\\Seen")
+        logger.info(f"Marked {len(uids)} email(s) as seen")
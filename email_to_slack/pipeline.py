@@ -0,0 +1,121 @@
+"""Process one fetched email: parse, route, post blocks and upload attachments."""
+
+import logging
+from dataclasses import dataclass, field
+
+from .config import CHANNEL_IDS, SUBJECT_ROUTES, USER_IDS, Config
+from .email import parse_email_to_mrkdwn
+from .slack import SlackClient, build_blocks_for_email
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeliveryProgress:
+    """Which parts of one email already reached Slack, so a retry can skip them."""
+    posted: bool = False
+    # Indexes into the email's attachments list.
+    attachments_uploaded: list[int] = field(default_factory=list)
+
+
+def route_for_subject(subject: str | None) -> str | None:
+    """Return the route key for a subject (first case-insensitive contains match)."""
+    subject_lower = (subject or "").lower()
+    for phrase, key in SUBJECT_ROUTES:
+        if phrase.lower() in subject_lower:
+            return key
+    return None
+
+
+def route_priority(route_key: str | None) -> int:
+    """Position of a route in SUBJECT_ROUTES (lower is more important); unrouted sorts last."""
+    for i, (_, key) in enumerate(SUBJECT_ROUTES):
+        if key == route_key:
+            return i
+    return len(SUBJECT_ROUTES)
+
+
+def route_target(route_key: str | None, config: Config) -> tuple[str | None, str | None]:
+    """Return (channel_id, user_id) for a route key; both None if it has no destination."""
+    if not route_key:
+        return None, None
+    ch_ids = config.slack.channel_ids or CHANNEL_IDS
+    u_ids = config.slack.user_ids or USER_IDS
+    return ch_ids.get(route_key), u_ids.get(route_key)
+
+
+def deliver_email(
+    em: dict,
+    *,
+    config: Config,
+    slack: SlackClient | None,
+    dry_run: bool = False,
+    progress: DeliveryProgress | None = None,
+) -> bool:
+    """
+    Parse one email dict (as returned by EmailFetcher) and send it to its Slack route.
+    Returns True if the message and all attachments were sent, False if it had
+    no route or any Slack call failed.
+    dry_run: parse and route only; nothing is sent (slack may be None).
+    progress: updated as each part is sent; parts it already records are skipped.
+    """
+    progress = progress or DeliveryProgress()
+    parsed = parse_email_to_mrkdwn(
+        html=em["html"],
+        subject=em["subject"],
+        date=em["date"],
+        from_addr=em["from"],
+        email_id=em["message_id"],
+    )
+
+    route_key = route_for_subject(em["subject"])
+    if not route_key:
+        logger.warning(f"No route matched for email subject: {em['subject']}")
+
+    channel_id, user_id = route_target(route_key, config)
+
+    if not channel_id and not user_id:
+        logger.error(f"No channel or user ID found for route: {route_key}")
+        return False
+
+    if dry_run or slack is None:
+        logger.info(f"[dry run] Would send '{em['subject']}' to {channel_id or user_id} ({route_key})")
+        return True
+
+    # Check if there are attachments
+    attachments = em.get("attachments") or []
+    has_attachments = len(attachments) > 0
+
+    # Build blocks with attachments section if needed
+    blocks = build_blocks_for_email(
+        subject=parsed.subject,
+        date=parsed.date,
+        text_content=parsed.text_content,
+        has_attachments=has_attachments,
+    )
+
+    # Post the message first
+    if not progress.posted:
+        progress.posted = slack.post_blocks(
+            blocks=blocks,
+            channel_id=channel_id,
+            user_id=user_id,
+            text=f"City of San Diego: {parsed.subject}",
+        )
+
+    # Then upload attachments (they will appear as separate messages after)
+    pending = [i for i in range(len(attachments)) if i not in progress.attachments_uploaded]
+    if pending:
+        logger.info(f"Uploading {len(pending)} attachment(s) for email: {em['subject']}")
+        for i in pending:
+            att = attachments[i]
+            uploaded = slack.upload_file(
+                content=att["content"],
+                filename=att.get("filename", "attachment"),
+                channel_id=channel_id,
+                user_id=user_id,
+            )
+            if uploaded is not None:
+                progress.attachments_uploaded.append(i)
+
+    return progress.posted and len(progress.attachments_uploaded) == len(attachments)
@@ -0,0 +1,198 @@
+"""Fit one run's work into the Cloud Run task timeout.
+
+The scheduler predicts each email's delivery cost from its size and attachment
+count, orders the batch, and stops taking new emails before the deadline so the
+rest stay unseen for the next run. Observed throughput is saved between runs to
+calibrate the cost model and size the next IMAP fetch.
+"""
+
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from .pipeline import route_for_subject, route_priority
+
+logger = logging.getLogger(__name__)
+
+# Prior cost of one email before any stats exist (seconds).
+BASE_COST_S = 1.0          # chat_postMessage round trip
+PER_MB_COST_S = 0.5        # parsing + upload bandwidth
+PER_ATTACHMENT_COST_S = 2.0  # files_upload_v2 is three API calls per file
+
+# Wall time per email assumed until stats exist; sizes the first IMAP listing.
+DEFAULT_SECONDS_PER_EMAIL = 5.0
+
+# Weight of the latest run when smoothing stats (exponential moving average).
+STATS_SMOOTHING = 0.5
+
+
+@dataclass
+class ThroughputStats:
+    """Throughput carried between runs (persisted as JSON)."""
+    # Observed / predicted delivery time; scales the cost model.
+    cost_scale: float = 1.0
+    # Wall time per email once delivery starts (fetch + deliver + flag), excluding
+    # per-run overhead such as login and listing; sizes the next listing.
+    seconds_per_email: float | None = None
+    runs: int = 0
+
+
+@dataclass
+class RunResult:
+    """Outcome of one scheduled run."""
+    processed_uids: list[str] = field(default_factory=list)
+    deferred_uids: list[str] = field(default_factory=list)
+    delivered: int = 0
+
+
+def load_stats(path: str) -> ThroughputStats:
+    """Read stats from path; returns defaults if path is empty, missing, or unreadable."""
+    if not path:
+        return ThroughputStats()
+    try:
+        data = json.loads(Path(path).read_text())
+        return ThroughputStats(
+            cost_scale=float(data.get("cost_scale", 1.0)),
+            seconds_per_email=data.get("seconds_per_email"),
+            runs=int(data.get("runs", 0)),
+        )
+    except FileNotFoundError:
+        return ThroughputStats()
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable run stats at {path}: {e}")
+        return ThroughputStats()
+
+
+def save_stats(path: str, stats: ThroughputStats) -> None:
+    """Write stats to path (no-op if path is empty)."""
+    if not path:
+        return
+    try:
+        Path(path).write_text(json.dumps(asdict(stats)))
+    except Exception as e:
+        logger.warning(f"Failed to save run stats to {path}: {e}")
+
+
+def _smooth(old: float | None, new: float) -> float:
+    if old is None:
+        return new
+    return STATS_SMOOTHING * new + (1 - STATS_SMOOTHING) * old
+
+
+class RunScheduler:
+    """Orders emails and runs them until the predicted next one would miss the deadline."""
+
+    def __init__(
+        self,
+        *,
+        time_budget_s: float,
+        safety_margin_s: float,
+        order: str = "oldest",
+        stats: ThroughputStats | None = None,
+        started_at: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if order not in ("oldest", "priority"):
+            raise ValueError(f"Unknown run order: {order!r}")
+        self.time_budget_s = time_budget_s
+        self.safety_margin_s = safety_margin_s
+        self.order = order
+        self.stats = stats or ThroughputStats()
+        self._clock = clock
+        self._started_at = clock() if started_at is None else started_at
+        self._predicted_s = 0.0
+        # Predictions before cost_scale is applied; the scale is fitted against these.
+        self._raw_predicted_s = 0.0
+        self._observed_s = 0.0
+        self._emails_done = 0
+        # Set when run() starts, so fixed startup cost is not spread over emails.
+        self._run_started_at: float | None = None
+
+    def remaining(self) -> float:
+        """Seconds left before the safety margin is reached."""
+        elapsed = self._clock() - self._started_at
+        return self.time_budget_s - self.safety_margin_s - elapsed
+
+    def _raw_cost(self, em: dict) -> float:
+        size_mb = (em.get("size") or 0) / (1024 * 1024)
+        # Listed candidates carry a BODYSTRUCTURE count; fetched emails carry the parts.
+        n_att = em.get("attachment_count")
+        if n_att is None:
+            n_att = len(em.get("attachments") or [])
+        return BASE_COST_S + PER_MB_COST_S * size_mb + PER_ATTACHMENT_COST_S * n_att
+
+    def predict(self, em: dict) -> float:
+        """Predicted seconds to fetch and deliver one email."""
+        return self._raw_cost(em) * self.stats.cost_scale
+
+    def batch_size(self) -> int:
+        """How many emails to list this run, from past throughput or a conservative default."""
+        per_email = self.stats.seconds_per_email or DEFAULT_SECONDS_PER_EMAIL
+        return max(1, int(self.remaining() / per_email))
+
+    def plan(self, emails: list[dict]) -> list[dict]:
+        """Order emails for delivery. Fetch order (IMAP UID) is oldest first."""
+        if self.order == "priority":
+            # sorted() is stable, so ties keep oldest-first order.
+            return sorted(emails, key=lambda em: route_priority(route_for_subject(em["subject"])))
+        return list(emails)
+
+    def run(self, emails: list[dict], handler: Callable[[dict], bool]) -> RunResult:
+        """
+        Call handler on each planned email while the prediction fits the remaining time.
+        Emails not started are reported as deferred so the caller leaves them unseen.
+        """
+        result = RunResult()
+        if self._run_started_at is None:
+            self._run_started_at = self._clock()
+        planned = self.plan(emails)
+        for i, em in enumerate(planned):
+            predicted = self.predict(em)
+            remaining = self.remaining()
+            if predicted > remaining:
+                result.deferred_uids = [e["uid"] for e in planned[i:]]
+                logger.warning(
+                    f"Stopping before deadline: next email needs ~{predicted:.1f}s, "
+                    f"{remaining:.1f}s left; deferring {len(result.deferred_uids)} email(s)"
+                )
+                break
+
+            t0 = self._clock()
+            try:
+                if handler(em):
+                    result.delivered += 1
+            except Exception as e:
+                logger.error(f"Error processing email '{em['subject']}': {e}")
+            # Attempted emails count as processed even if delivery failed, so a
+            # bad email is flagged once instead of being retried every run.
+            result.processed_uids.append(em["uid"])
+            self._predicted_s += predicted
+            self._raw_predicted_s += self._raw_cost(em)
+            self._observed_s += self._clock() - t0
+            self._emails_done += 1
+
+        return result
+
+    def finish(self) -> ThroughputStats:
+        """Fold this run's observations into the stats and return them."""
+        elapsed = self._clock() - self._started_at
+        if self._emails_done:
+            run_elapsed = self._clock() - self._run_started_at
+            if self._raw_predicted_s > 0:
+                self.stats.cost_scale = _smooth(
+                    self.stats.cost_scale, self._observed_s / self._raw_predicted_s
+                )
+            self.stats.seconds_per_email = _smooth(
+                self.stats.seconds_per_email, run_elapsed / self._emails_done
+            )
+            self.stats.runs += 1
+            logger.info(
+                f"Run throughput: {self._emails_done} email(s) in {elapsed:.1f}s "
+                f"(delivery {self._observed_s:.1f}s vs predicted {self._predicted_s:.1f}s); "
+                f"cost scale {self.stats.cost_scale:.2f}, "
+                f"{self.stats.seconds_per_email:.2f}s per email"
+            )
+        return self.stats
@@ -5,6 +5,7 @@ from typing import Any
 
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
 
 logger = logging.getLogger(__name__)
 
@@ -12,8 +13,11 @@ logger = logging.getLogger(__name__)
 class SlackClient:
     """Upload files to Slack and post block messages to channels or users."""
 
-    def __init__(self, token: str) -> None:
+    def __init__(self, token: str, *, retry_on_rate_limit: bool = False) -> None:
         self._client = WebClient(token=token)
+        if retry_on_rate_limit:
+            # Wait out "ratelimited" responses (Retry-After) instead of failing.
+            self._client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=5))
 
     def upload_file(
         self,
@@ -0,0 +1,97 @@
+"""Tests for reading mbox files and .eml directories."""
+
+from pathlib import Path
+
+from email_to_slack.email.archive import archive_files, iter_archive, iter_mbox
+
+MBOX = (
+    b"From sender@example.com Mon Jan  1 00:00:00 2024\n"
+    b"Subject: one\n"
+    b"\n"
+    b"first body\n"
+    b">From the city\n"
+    b">>From a reply\n"
+    b"\n"
+    b"From sender@example.com Tue Jan  2 00:00:00 2024\n"
+    b"Subject: two\n"
+    b"\n"
+    b"second body\n"
+    b"\n"
+    b"From sender@example.com Wed Jan  3 00:00:00 2024\n"
+    b"Subject: three\n"
+    b"\n"
+    b"third body\n"
+)
+
+
+def _write(path: Path, data: bytes) -> Path:
+    path.write_bytes(data)
+    return path
+
+
+def test_mbox_splits_messages(tmp_path):
+    path = _write(tmp_path / "a.mbox", MBOX)
+    messages = list(iter_mbox(path))
+    assert [m.raw.split(b"\n", 1)[0] for m in messages] == [
+        b"Subject: one",
+        b"Subject: two",
+        b"Subject: three",
+    ]
+    assert messages[-1].end_offset == len(MBOX)
+    assert all(m.source == str(path) for m in messages)
+
+
+def test_mbox_undoes_mboxrd_quoting(tmp_path):
+    path = _write(tmp_path / "a.mbox", MBOX)
+    first = next(iter_mbox(path))
+    assert b"\nFrom the city\n" in first.raw
+    assert b"\n>From a reply\n" in first.raw
+
+
+def test_mbox_resumes_from_end_offset(tmp_path):
+    path = _write(tmp_path / "a.mbox", MBOX)
+    first, second, _ = iter_mbox(path)
+    resumed = list(iter_mbox(path, start=first.end_offset))
+    assert [m.end_offset for m in resumed] == [second.end_offset, len(MBOX)]
+    assert resumed[0].raw == second.raw
+
+
+def test_mbox_with_crlf_line_endings(tmp_path):
+    path = _write(tmp_path / "a.mbox", MBOX.replace(b"\n", b"\r\n"))
+    messages = list(iter_mbox(path))
+    assert [m.raw.split(b"\r\n", 1)[0] for m in messages] == [
+        b"Subject: one",
+        b"Subject: two",
+        b"Subject: three",
+    ]
+    assert b"\r\nFrom the city\r\n" in messages[0].raw
+
+
+def test_empty_files_yield_nothing(tmp_path):
+    mbox = _write(tmp_path / "empty.mbox", b"")
+    eml = _write(tmp_path / "empty.eml", b"")
+    assert list(iter_archive([mbox, eml])) == []
+
+
+def test_checkpoint_skips_finished_files(tmp_path):
+    mbox = _write(tmp_path / "a.mbox", MBOX)
+    eml_dir = tmp_path / "eml"
+    eml_dir.mkdir()
+    done = _write(eml_dir / "1.eml", b"Subject: done\n\nbody\n")
+    todo = _write(eml_dir / "2.eml", b"Subject: todo\n\nbody\n")
+
+    files = archive_files([mbox, eml_dir])
+    assert files == [mbox.resolve(), done.resolve(), todo.resolve()]
+
+    checkpoint = {str(mbox.resolve()): len(MBOX), str(done.resolve()): done.stat().st_size}
+    messages = list(iter_archive(files, checkpoint))
+    assert [m.source for m in messages] == [str(todo.resolve())]
+    assert messages[0].raw == todo.read_bytes()
+
+
+def test_checkpoint_keys_match_relative_paths(tmp_path, monkeypatch):
+    mbox = _write(tmp_path / "a.mbox", MBOX)
+    monkeypatch.chdir(tmp_path)
+    files = archive_files([Path("a.mbox")])
+    checkpoint = {str(mbox.resolve()): len(MBOX)}
+    assert list(iter_archive(files, checkpoint)) == []
@@ -0,0 +1,45 @@
+"""Tests for IMAP FETCH response parsing used when listing unseen emails."""
+
+from email_to_slack.email.fetcher import (
+    _SIZE_RE,
+    _attachment_count,
+    _flatten_fetch_response,
+)
+
+HEADER = b'From: noreply@sandiego.gov\r\nSubject: "Permit" \\ issued\r\n\r\n'
+
+
+def _response(bodystructure: bytes) -> list:
+    meta = (
+        b"5 (UID 5 RFC822.SIZE 48213 BODYSTRUCTURE " + bodystructure
+        + b" BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {%d}" % len(HEADER)
+    )
+    return [(meta, HEADER), b")"]
+
+
+def test_single_part_has_no_attachments():
+    line, header = _flatten_fetch_response(_response(
+        b'("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 10 1 NIL NIL NIL)'
+    ))
+    assert header == HEADER
+    assert _SIZE_RE.search(line).group(1) == b"48213"
+    assert _attachment_count(line) == 0
+
+
+def test_counts_named_parts_in_multipart():
+    line, _ = _flatten_fetch_response(_response(
+        b'((("TEXT" "PLAIN" ("CHARSET" "UTF-8") NIL NIL "7BIT" 12 1 NIL NIL NIL)'
+        b'("TEXT" "HTML" ("CHARSET" "UTF-8") NIL NIL "7BIT" 40 2 NIL NIL NIL)'
+        b' "ALTERNATIVE" ("BOUNDARY" "b1") NIL NIL)'
+        b'("APPLICATION" "PDF" ("NAME" "permit.pdf") NIL NIL "BASE64" 40000 NIL'
+        b' ("ATTACHMENT" ("FILENAME" "permit.pdf")) NIL)'
+        b'("IMAGE" "PNG" NIL NIL NIL "BASE64" 400 NIL'
+        b' ("INLINE" ("FILENAME*" "utf-8\'\'a%20b.png")) NIL)'
+        b' "MIXED" ("BOUNDARY" "b0") NIL NIL)'
+    ))
+    assert _attachment_count(line) == 2
+
+
+def test_malformed_bodystructure_counts_zero():
+    line, _ = _flatten_fetch_response(_response(b'("TEXT" "HTML" ("CHARSET"'))
+    assert _attachment_count(line) == 0
@@ -0,0 +1,93 @@
+"""Tests for the run scheduler, driven by a fake clock."""
+
+import pytest
+
+from email_to_slack.scheduler import BASE_COST_S, RunScheduler, ThroughputStats
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _emails(n: int) -> list[dict]:
+    return [{"uid": str(i), "subject": f"email {i}", "size": 0} for i in range(n)]
+
+
+def _run_once(stats: ThroughputStats, slowdown: float, n: int = 5) -> ThroughputStats:
+    """One run where every delivery takes slowdown x the raw predicted cost."""
+    clock = FakeClock()
+    scheduler = RunScheduler(
+        time_budget_s=1000, safety_margin_s=0, stats=stats, clock=clock
+    )
+
+    def handler(em: dict) -> bool:
+        clock.now += BASE_COST_S * slowdown
+        return True
+
+    scheduler.run(_emails(n), handler)
+    return scheduler.finish()
+
+
+def test_cost_scale_converges_to_observed_ratio():
+    stats = ThroughputStats()
+    for _ in range(12):
+        stats = _run_once(stats, slowdown=2.0)
+    assert stats.cost_scale == pytest.approx(2.0, rel=1e-3)
+    assert stats.seconds_per_email == pytest.approx(2.0, rel=1e-3)
+
+
+def test_stable_scale_stays_put():
+    stats = _run_once(ThroughputStats(cost_scale=3.0), slowdown=3.0)
+    assert stats.cost_scale == pytest.approx(3.0)
+
+
+def test_stops_before_deadline_and_defers_rest():
+    clock = FakeClock()
+    scheduler = RunScheduler(time_budget_s=10, safety_margin_s=2, clock=clock)
+
+    def handler(em: dict) -> bool:
+        clock.now += 3
+        return True
+
+    result = scheduler.run(_emails(5), handler)
+    assert result.processed_uids == ["0", "1", "2"]
+    assert result.deferred_uids == ["3", "4"]
+    assert result.delivered == 3
+
+
+def test_batch_size_defaults_without_stats():
+    scheduler = RunScheduler(time_budget_s=300, safety_margin_s=30, clock=FakeClock())
+    assert scheduler.batch_size() == 54
+
+
+def test_attachment_heavy_candidate_is_deferred():
+    clock = FakeClock()
+    scheduler = RunScheduler(time_budget_s=10, safety_margin_s=2, clock=clock)
+    light = {"uid": "1", "subject": "light", "size": 0, "attachment_count": 0}
+    heavy = {"uid": "2", "subject": "heavy", "size": 0, "attachment_count": 5}
+
+    def handler(em: dict) -> bool:
+        clock.now += 1
+        return True
+
+    result = scheduler.run([light, heavy], handler)
+    assert result.processed_uids == ["1"]
+    assert result.deferred_uids == ["2"]
+
+
+def test_startup_overhead_not_counted_per_email():
+    clock = FakeClock()
+    scheduler = RunScheduler(time_budget_s=300, safety_margin_s=30, clock=clock)
+    clock.now = 20.0  # imports, IMAP login, SEARCH and listing
+
+    def handler(em: dict) -> bool:
+        clock.now += 2
+        return True
+
+    scheduler.run(_emails(1), handler)
+    stats = scheduler.finish()
+    assert stats.seconds_per_email == pytest.approx(2.0)